@@ -0,0 +1,165 @@
+import bisect
+import json
+import os
+import numpy as np
+from env.traffic_simulation import DIRECTIONS
+
+POSITION_SCALE = 4  # positions are stored as integers in quarter pixels
+COUNTER_NAMES = ["waiting_north", "waiting_south", "waiting_east", "waiting_west", "departures"]
+TIME_TOLERANCE = 1e-6  # timestamps are summed float steps, so seeks match within this
+
+class TraceRecorder:
+    # Writes one compressed block per keyframe interval. A block opens with the absolute
+    # positions of every vehicle (the keyframe) and then stores per-frame position deltas,
+    # so any block can be decoded on its own and blocks double as seek points.
+    def __init__(self, path, keyframe_interval=600):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        os.makedirs(path, exist_ok=True)
+        self.index = {"position_scale": POSITION_SCALE, "counters": COUNTER_NAMES, "blocks": []}
+        self.frame_count = 0
+        self.time = 0.0
+        self.start_block()
+
+    def start_block(self):
+        self.block_start_frame = self.frame_count
+        self.previous = {}
+        self.times = []
+        self.phases = []
+        self.counters = []
+        self.frame_sizes = []
+        self.ids = []
+        self.dx = []
+        self.dy = []
+        self.new_counts = []
+        self.new_ids = []
+        self.new_dirs = []
+        self.new_x = []
+        self.new_y = []
+
+    def record(self, dt, phase, vehicle_manager):
+        self.time += dt
+        if not self.times:
+            # A block is indexed by the time of its first recorded frame
+            self.block_start_time = self.time
+        current = {}
+        new_count = 0
+        for v in vehicle_manager.vehicles:
+            qx, qy = int(round(v.x * POSITION_SCALE)), int(round(v.y * POSITION_SCALE))
+            current[v.id] = (qx, qy)
+            self.ids.append(v.id)
+            if v.id in self.previous:
+                px, py = self.previous[v.id]
+                self.dx.append(qx - px)
+                self.dy.append(qy - py)
+            else:
+                self.dx.append(0)
+                self.dy.append(0)
+                self.new_ids.append(v.id)
+                self.new_dirs.append(DIRECTIONS.index(v.direction))
+                self.new_x.append(qx)
+                self.new_y.append(qy)
+                new_count += 1
+        self.previous = current
+        self.times.append(self.time)
+        self.phases.append(phase)
+        wait_counts = vehicle_manager.get_wait_counts()
+        departures = sum(stats["departures"] for stats in vehicle_manager.lane_stats.values())
+        self.counters.append([wait_counts[d] for d in DIRECTIONS] + [departures])
+        self.frame_sizes.append(len(current))
+        self.new_counts.append(new_count)
+        self.frame_count += 1
+        if self.frame_count - self.block_start_frame >= self.keyframe_interval:
+            self.write_block()
+            self.start_block()
+
+    def write_block(self):
+        if not self.times:
+            return
+        name = f"block_{len(self.index['blocks']):06d}.npz"
+        np.savez_compressed(
+            os.path.join(self.path, name),
+            times=np.array(self.times, dtype=np.float64),
+            phases=np.array(self.phases, dtype=np.int8),
+            counters=np.array(self.counters, dtype=np.int32),
+            frame_sizes=np.array(self.frame_sizes, dtype=np.int32),
+            ids=np.array(self.ids, dtype=np.int64),
+            dx=np.array(self.dx, dtype=np.int16),
+            dy=np.array(self.dy, dtype=np.int16),
+            new_counts=np.array(self.new_counts, dtype=np.int32),
+            new_ids=np.array(self.new_ids, dtype=np.int64),
+            new_dirs=np.array(self.new_dirs, dtype=np.int8),
+            new_x=np.array(self.new_x, dtype=np.int32),
+            new_y=np.array(self.new_y, dtype=np.int32)
+        )
+        self.index["blocks"].append({
+            "file": name,
+            "start_frame": self.block_start_frame,
+            "start_time": self.block_start_time,
+            "frames": len(self.times)
+        })
+        with open(os.path.join(self.path, "index.json"), 'w') as file:
+            json.dump(self.index, file)
+
+    def close(self):
+        self.write_block()
+        self.start_block()
+
+class TraceReader:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "index.json"), 'r') as file:
+            self.index = json.load(file)
+        self.blocks = self.index["blocks"]
+        self.scale = self.index["position_scale"]
+        self.start_times = [block["start_time"] for block in self.blocks]
+
+    def __len__(self):
+        return sum(block["frames"] for block in self.blocks)
+
+    def block_for_time(self, timestamp):
+        return max(bisect.bisect_right(self.start_times, timestamp + TIME_TOLERANCE) - 1, 0)
+
+    def decode_block(self, block_index):
+        # Yields (frame_number, time, phase, counters, vehicles) with vehicles as (id, direction, x, y)
+        block = self.blocks[block_index]
+        # Each NpzFile lookup decompresses the array again, so every array is read once up front
+        with np.load(os.path.join(self.path, block["file"])) as npz:
+            data = dict(npz)
+        ids, dx, dy = data["ids"], data["dx"], data["dy"]
+        new_ids, new_dirs, new_x, new_y = data["new_ids"], data["new_dirs"], data["new_x"], data["new_y"]
+        positions = {}
+        directions = {}
+        offset = 0
+        new_offset = 0
+        for i in range(block["frames"]):
+            size = data["frame_sizes"][i]
+            new_count = data["new_counts"][i]
+            for j in range(new_offset, new_offset + new_count):
+                vid = int(new_ids[j])
+                positions[vid] = (int(new_x[j]), int(new_y[j]))
+                directions[vid] = DIRECTIONS[new_dirs[j]]
+            new_offset += new_count
+            fresh = set(int(v) for v in new_ids[new_offset - new_count:new_offset])
+            current = {}
+            vehicles = []
+            for j in range(offset, offset + size):
+                vid = int(ids[j])
+                x, y = positions[vid]
+                if vid not in fresh:
+                    x, y = x + int(dx[j]), y + int(dy[j])
+                current[vid] = (x, y)
+                vehicles.append((vid, directions[vid], x / self.scale, y / self.scale))
+            offset += size
+            positions = current
+            yield (block["start_frame"] + i, float(data["times"][i]), int(data["phases"][i]),
+                   dict(zip(self.index["counters"], data["counters"][i].tolist())), vehicles)
+
+    def frames(self, start_time=0.0, end_time=None):
+        for block_index in range(self.block_for_time(start_time), len(self.blocks)):
+            for frame in self.decode_block(block_index):
+                if frame[1] < start_time - TIME_TOLERANCE:
+                    continue
+                if end_time is not None and frame[1] > end_time + TIME_TOLERANCE:
+                    return
+                yield frame
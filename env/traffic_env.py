@@ -1,5 +1,13 @@
 import numpy as np
 
+# Integer ids matching env.traffic_simulation.Phase
+PHASE_IDS = {
+    "vertical_green": 0,
+    "vertical_yellow": 1,
+    "horizontal_green": 2,
+    "horizontal_yellow": 3
+}
+
 class TrafficEnv:
     def __init__(self, config):
         self.num_lanes = 4
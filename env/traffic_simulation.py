@@ -90,7 +90,10 @@ PHASE_DURATIONS = {
 
 class Vehicle:
     def __init__(self, direction):
+        self.id = None
         self.direction = direction
+        self.wait_time = 0.0
+        self.stopped_since = None
         self.width, self.height = 30, 15
         self.speed = SPEED
         self.stopped = False
@@ -211,18 +214,93 @@ class Vehicle:
         else:
             pygame.draw.rect(screen, color, (self.x, self.y, 40, 20))
 
+DIRECTIONS = ["north", "south", "east", "west"]
+PIXELS_PER_METER = config['environment']['pixels_per_meter']
+VEHICLE_LENGTH = 40  # drawn length along the direction of travel, in pixels
+STOP_LINES = {
+    "north": CENTER_Y + ROAD_WIDTH // 2,
+    "south": CENTER_Y - ROAD_WIDTH // 2,
+    "east": CENTER_X - ROAD_WIDTH // 2,
+    "west": CENTER_X + ROAD_WIDTH // 2
+}
+
+def distance_to_rear(vehicle):
+    # Pixels from the stop line back to the rear bumper of a vehicle that has not crossed it
+    if vehicle.direction == "north":
+        return vehicle.y + VEHICLE_LENGTH - STOP_LINES["north"]
+    elif vehicle.direction == "south":
+        return STOP_LINES["south"] - vehicle.y
+    elif vehicle.direction == "east":
+        return STOP_LINES["east"] - vehicle.x
+    return vehicle.x + VEHICLE_LENGTH - STOP_LINES["west"]
+
+def new_lane_stats():
+    return {
+        "waiting": 0,          # vehicles currently stopped before the stop line
+        "queue_length": 0.0,   # meters from the stop line to the rear of the last stopped vehicle
+        "peak_queue_length": 0.0,
+        "arrivals": 0,         # vehicles that entered the approach
+        "departures": 0,       # vehicles that crossed the stop line
+        "exits": 0,            # vehicles that left the screen
+        "stops": 0,            # stop events, counting repeated stops of one vehicle
+        "wait_time": 0.0,      # cumulative vehicle-seconds spent waiting, including vehicles still queued
+        "departed_wait_time": 0.0  # total waiting of the vehicles counted in departures
+    }
+
 class VehicleManager:
     def __init__(self):
         self.vehicles = []
         self.spawn_timer = 0
         self.config = load_config()
         self.spawn_interval = self.config['environment']['vehicle_spawn_interval']
-    
+        self.elapsed_time = 0.0
+        self.lane_stats = {d: new_lane_stats() for d in DIRECTIONS}
+        self.queued = {d: {} for d in DIRECTIONS}
+        self.next_id = 0
+
+    def add_vehicle(self, vehicle):
+        vehicle.id = self.next_id
+        self.next_id += 1
+        self.vehicles.append(vehicle)
+        self.lane_stats[vehicle.direction]["arrivals"] += 1
+
+    def update_queue_length(self, direction):
+        # Stopped vehicles do not move, so the queue only changes on stop/start events
+        queued = self.queued[direction].values()
+        stats = self.lane_stats[direction]
+        stats["queue_length"] = max((max(distance_to_rear(v), 0) for v in queued), default=0) / PIXELS_PER_METER
+        stats["peak_queue_length"] = max(stats["peak_queue_length"], stats["queue_length"])
+
+    def on_stop(self, vehicle):
+        stats = self.lane_stats[vehicle.direction]
+        stats["waiting"] += 1
+        stats["stops"] += 1
+        vehicle.stopped_since = self.elapsed_time
+        self.queued[vehicle.direction][vehicle.id] = vehicle
+        self.update_queue_length(vehicle.direction)
+
+    def on_start(self, vehicle):
+        stats = self.lane_stats[vehicle.direction]
+        stats["waiting"] -= 1
+        vehicle.wait_time += self.elapsed_time - vehicle.stopped_since
+        vehicle.stopped_since = None
+        del self.queued[vehicle.direction][vehicle.id]
+        self.update_queue_length(vehicle.direction)
+
+    def on_depart(self, vehicle):
+        stats = self.lane_stats[vehicle.direction]
+        stats["departures"] += 1
+        stats["departed_wait_time"] += vehicle.wait_time
+
     def update(self, dt, phase):
+        self.elapsed_time += dt
+        # Waiting counts only change on stop/start events, so accruing wait time is O(lanes)
+        for stats in self.lane_stats.values():
+            stats["wait_time"] += stats["waiting"] * dt
         self.spawn_timer += dt
         if self.spawn_timer >= self.spawn_interval:
             self.spawn_timer = 0
-            direction = random.choice(["north", "south", "east", "west"])
+            direction = random.choice(DIRECTIONS)
             can_spawn = True
             for v in self.vehicles:
                 if v.direction == direction and not v.passed:
@@ -235,27 +313,57 @@ class VehicleManager:
                     elif direction == "west" and v.x > WIDTH - 100:
                         can_spawn = False
             if can_spawn:
-                self.vehicles.append(Vehicle(direction))
+                self.add_vehicle(Vehicle(direction))
         for v in self.vehicles:
+            was_stopped = v.stopped
+            was_crossed = v.crossed_stop_line
             v.update(phase, self.vehicles)
-        self.vehicles = [v for v in self.vehicles if not (
-            (v.direction == "north" and v.y < -50) or
-            (v.direction == "south" and v.y > HEIGHT + 50) or
-            (v.direction == "east" and v.x > WIDTH + 50) or
-            (v.direction == "west" and v.x < -50)
-        )]
+            if v.stopped and not was_stopped:
+                self.on_stop(v)
+            elif was_stopped and not v.stopped:
+                self.on_start(v)
+            if v.crossed_stop_line and not was_crossed:
+                self.on_depart(v)
+        remaining = []
+        for v in self.vehicles:
+            if (v.direction == "north" and v.y < -50) or \
+               (v.direction == "south" and v.y > HEIGHT + 50) or \
+               (v.direction == "east" and v.x > WIDTH + 50) or \
+               (v.direction == "west" and v.x < -50):
+                if v.stopped:
+                    self.on_start(v)
+                self.lane_stats[v.direction]["exits"] += 1
+            else:
+                remaining.append(v)
+        self.vehicles = remaining
 
     def draw(self, screen):
         for v in self.vehicles:
             v.draw(screen)
 
     def get_wait_counts(self):
-        counts = {"north": 0, "south": 0, "east": 0, "west": 0}
-        for v in self.vehicles:
-            if v.stopped and not v.passed:
-                counts[v.direction] += 1
-        return counts
-        
+        return {d: stats["waiting"] for d, stats in self.lane_stats.items()}
+
+    def get_lane_stats(self):
+        return {d: dict(stats) for d, stats in self.lane_stats.items()}
+
+    def get_metrics(self):
+        total_wait = sum(stats["wait_time"] for stats in self.lane_stats.values())
+        departed_wait = sum(stats["departed_wait_time"] for stats in self.lane_stats.values())
+        departures = sum(stats["departures"] for stats in self.lane_stats.values())
+        return {
+            "elapsed_time": self.elapsed_time,
+            "throughput": departures,
+            "throughput_per_minute": 60.0 * departures / self.elapsed_time if self.elapsed_time else 0.0,
+            "total_wait_time": total_wait,
+            # Mean waiting per vehicle that has crossed the stop line; queued vehicles count once they cross
+            "average_delay": departed_wait / departures if departures else 0.0,
+            "peak_queue_length": max(stats["peak_queue_length"] for stats in self.lane_stats.values())
+        }
+
     def reset(self):
         self.vehicles = []
-        self.spawn_timer = 0
\ No newline at end of file
+        self.spawn_timer = 0
+        self.elapsed_time = 0.0
+        self.lane_stats = {d: new_lane_stats() for d in DIRECTIONS}
+        self.queued = {d: {} for d in DIRECTIONS}
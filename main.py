@@ -1,29 +1,27 @@
 import pygame
 import random
 from training.train import train
-from models.reinforce_agent import TrafficControllerRL
+from visualization.console_output import print_simulation_summary
+from models.reinforce_agent import TrafficControllerRL, load_config
+from training.experience_store import ExperienceStore
+from env.trace import TraceRecorder
 from env.traffic_simulation import VehicleManager, Vehicle
 from env.traffic_simulation import WIDTH, HEIGHT, draw_intersection, draw_stop_lines, draw_traffic_lights, draw_info
 
-def main():
+def run_headless(controller, vehicle_manager, duration, dt, recorder=None):
+    # Fixed-step simulation with no window; inspect it later through the trace renderer
+    for _ in range(int(duration / dt)):
+        controller.update(dt, vehicle_manager, training=False)
+        vehicle_manager.update(dt, controller.current_phase)
+        if recorder is not None:
+            recorder.record(dt, controller.current_phase, vehicle_manager)
+
+def run_live(controller, vehicle_manager, recorder=None):
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("4-Way Intersection Traffic Control (RL)")
     clock = pygame.time.Clock()
 
-    # Train the agent first
-    print("Starting training phase...")
-    train(200, save_path="models/policy.pth")
-    print("Training complete. Starting simulation with trained agent...")
-
-    # Now run the simulation with the trained agent
-    controller = TrafficControllerRL(epsilon_start=0.0)  # Set epsilon to 0 for full exploitation
-    controller.load("models/policy.pth")
-    vehicle_manager = VehicleManager()
-    for _ in range(8):
-        direction = random.choice(["north", "south", "east", "west"])
-        vehicle_manager.vehicles.append(Vehicle(direction))
-
     running = True
     while running:
         dt = clock.tick(60) / 1000.0
@@ -40,6 +38,8 @@ def main():
         # Update controller and vehicles (agent acts greedily)
         controller.update(dt, vehicle_manager, training=False)
         vehicle_manager.update(dt, controller.current_phase)
+        if recorder is not None:
+            recorder.record(dt, controller.current_phase, vehicle_manager)
 
         # Draw everything
         draw_intersection(screen)
@@ -51,5 +51,41 @@ def main():
 
     pygame.quit()
 
+def main():
+    # Train the agent first
+    print("Starting training phase...")
+    train(200, save_path="models/policy.pth")
+    print("Training complete. Starting simulation with trained agent...")
+
+    # Now run the simulation with the trained agent
+    config = load_config()
+    store = None
+    if config['experience']['record_deployment']:
+        store = ExperienceStore(config['experience']['deployment_path'], segment_size=config['experience']['segment_size'])
+    controller = TrafficControllerRL(
+        epsilon_start=0.0,  # Set epsilon to 0 for full exploitation
+        telemetry_size=config['inference']['telemetry_size'],
+        experience_store=store
+    )
+    controller.load("models/policy.pth")
+    vehicle_manager = VehicleManager()
+    for _ in range(8):
+        direction = random.choice(["north", "south", "east", "west"])
+        vehicle_manager.add_vehicle(Vehicle(direction))
+
+    recorder = None
+    if config['trace']['path']:
+        recorder = TraceRecorder(config['trace']['path'], keyframe_interval=config['trace']['keyframe_interval'])
+    if config['simulation']['headless']:
+        run_headless(controller, vehicle_manager, config['simulation']['duration'], config['simulation']['dt'], recorder)
+    else:
+        run_live(controller, vehicle_manager, recorder)
+
+    if recorder is not None:
+        recorder.close()
+    if store is not None:
+        store.close()
+    print_simulation_summary(vehicle_manager.get_metrics(), vehicle_manager.get_lane_stats())
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
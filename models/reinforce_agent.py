@@ -1,9 +1,11 @@
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import torch.optim as optim
 import numpy as np
 import random
 import yaml
+from collections import deque
 from env.traffic_simulation import Phase
 
 def load_config(config_path='configs/config.yaml'):
@@ -24,9 +26,46 @@ class PolicyNetwork(nn.Module):
     def forward(self, x):
         return self.net(x)
 
+class ValueNetwork(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.net = nn.Sequential(
+            nn.Linear(7, 32),
+            nn.ReLU(),
+            nn.Linear(32, 32),
+            nn.ReLU(),
+            nn.Linear(32, 1)
+        )
+    def forward(self, x):
+        return self.net(x).squeeze(-1)
+
+def discounted_cumsum(x, dones, discount, last=None):
+    # y[t] = x[t] + discount * (1 - dones[t]) * y[t + 1] with y[T] = last, over [T] or [T, N] inputs.
+    # One reverse pass over T; each step is a single op across all N episodes.
+    decay = discount * (1.0 - dones)
+    out = torch.empty_like(x)
+    running = torch.zeros_like(x[0]) if last is None else last
+    for t in range(x.shape[0] - 1, -1, -1):
+        running = x[t] + decay[t] * running
+        out[t] = running
+    return out
+
+def discounted_returns(rewards, dones, gamma, last_value=None):
+    # rewards/dones are [T] or [T, N] (N episodes side by side); a done cuts the return at that step
+    return discounted_cumsum(rewards, dones, gamma, last_value)
+
+def compute_gae(rewards, values, dones, gamma, lam, last_value=None):
+    # Generalized advantage estimation over [T] or [T, N] rollouts; returns (advantages, returns)
+    last = torch.zeros_like(rewards[0]) if last_value is None else last_value
+    next_values = torch.cat([values[1:], last.unsqueeze(0)])
+    deltas = rewards + gamma * next_values * (1.0 - dones) - values
+    advantages = discounted_cumsum(deltas, dones, gamma * lam)
+    return advantages, advantages + values
+
 class TrafficControllerRL:
-    def __init__(self, epsilon_start=1.0, epsilon_min=0.05, epsilon_decay=0.95, reward_based_decay=False):
-        config = load_config()
+    def __init__(self, epsilon_start=1.0, epsilon_min=0.05, epsilon_decay=0.95, reward_based_decay=False,
+                 telemetry_size=0, use_baseline=None, config_path='configs/config.yaml', experience_store=None):
+        config = load_config(config_path)
         self.Phase = Phase
         self.PHASE_DURATIONS = {
             0: config['phase_durations']['VERT_GREEN'],
@@ -40,9 +79,16 @@ class TrafficControllerRL:
         self.policy = PolicyNetwork()
         self.optimizer = optim.Adam(self.policy.parameters(), lr=config['rl']['learning_rate'])
         self.gamma = config['rl']['gamma']
+        self.gae_lambda = config['rl']['gae_lambda']
+        if use_baseline is None:
+            use_baseline = config['rl']['use_value_baseline']
+        self.value_net = ValueNetwork() if use_baseline else None
+        if self.value_net is not None:
+            self.value_optimizer = optim.Adam(self.value_net.parameters(), lr=config['rl']['value_learning_rate'])
         self.rewards_history = []
         self.log_probs = []
         self.state_history = []
+        self.dones_history = []
         self.last_phase = None
         self.epsilon_start = epsilon_start
         self.epsilon = epsilon_start
@@ -52,6 +98,10 @@ class TrafficControllerRL:
         self.reward_based_decay = reward_based_decay
         self.reward_threshold = 100
         self.reward_increment = 50
+        # Inference keeps at most telemetry_size recent decisions; 0 disables telemetry
+        self.telemetry = deque(maxlen=telemetry_size) if telemetry_size else None
+        # Optional training.experience_store.ExperienceStore that records live decisions
+        self.experience_store = experience_store
 
     def get_state(self, vehicle_manager):
         wait_counts = vehicle_manager.get_wait_counts()
@@ -97,57 +147,105 @@ class TrafficControllerRL:
             return new_phase == self.Phase.VERT_GREEN
         return False
 
+    def next_valid_phase(self):
+        if self.current_phase == self.Phase.VERT_GREEN:
+            return self.Phase.VERT_YELLOW
+        elif self.current_phase == self.Phase.VERT_YELLOW:
+            return self.Phase.HORZ_GREEN
+        elif self.current_phase == self.Phase.HORZ_GREEN:
+            return self.Phase.HORZ_YELLOW
+        elif self.current_phase == self.Phase.HORZ_YELLOW:
+            return self.Phase.VERT_GREEN
+
+    def compute_reward(self, vehicle_manager, original_action):
+        wait_counts = vehicle_manager.get_wait_counts()
+        total_waiting = sum(wait_counts.values())
+        base_reward = -min(total_waiting, 100) / 10.0
+        transition_reward = 20 if self.is_valid_phase_transition(original_action) else -20
+        return base_reward + transition_reward
+
     def update(self, dt, vehicle_manager, training=True):
         self.phase_timer += dt
-        if self.phase_timer >= self.PHASE_DURATIONS[self.current_phase]:
+        if self.phase_timer < self.PHASE_DURATIONS[self.current_phase]:
+            return
+        if not training:
+            self.infer(vehicle_manager)
+            return
+        state = self.get_state(vehicle_manager)
+        if len(self.rewards_history) >= 5:
+            # The window is truncated, not terminal: the state now observed closes it
+            self.update_policy(next_state=state)
+        action, log_prob = self.select_action(state, training=training)
+        original_action = action
+        if not self.is_valid_phase_transition(action):
+            action = self.next_valid_phase()
+            action_probs = self.policy(state)
+            action_probs = torch.clamp(action_probs, min=1e-6)
+            log_prob = torch.log(action_probs[action])
+        self.store_transition(state, log_prob, self.compute_reward(vehicle_manager, original_action))
+        self.last_phase = self.current_phase
+        self.current_phase = action
+        self.phase_timer = 0
+
+    def infer(self, vehicle_manager):
+        # Deployment path: no autograd graph and no trajectory storage, so memory stays flat
+        with torch.no_grad():
             state = self.get_state(vehicle_manager)
-            action, log_prob = self.select_action(state, training=training)
-            original_action = action
-            if not self.is_valid_phase_transition(action):
-                if self.current_phase == self.Phase.VERT_GREEN:
-                    action = self.Phase.VERT_YELLOW
-                elif self.current_phase == self.Phase.VERT_YELLOW:
-                    action = self.Phase.HORZ_GREEN
-                elif self.current_phase == self.Phase.HORZ_GREEN:
-                    action = self.Phase.HORZ_YELLOW
-                elif self.current_phase == self.Phase.HORZ_YELLOW:
-                    action = self.Phase.VERT_GREEN
-                action_probs = self.policy(state)
-                action_probs = torch.clamp(action_probs, min=1e-6)
-                log_prob = torch.log(action_probs[action])
-            self.state_history.append(state)
-            self.log_probs.append(log_prob)
-            wait_counts = vehicle_manager.get_wait_counts()
-            total_waiting = sum(wait_counts.values())
-            base_reward = -min(total_waiting, 100) / 10.0
-            transition_reward = 20 if self.is_valid_phase_transition(original_action) else -20
-            total_reward = base_reward + transition_reward
-            self.rewards_history.append(total_reward)
-            self.last_phase = self.current_phase
-            self.current_phase = action
-            self.phase_timer = 0
-            if training and len(self.rewards_history) >= 5:
-                self.update_policy()
-
-    def update_policy(self):
-        R = 0
-        returns = []
-        for r in self.rewards_history[::-1]:
-            R = r + self.gamma * R
-            returns.insert(0, R)
-        returns = torch.tensor(returns)
-        if len(returns) > 1:
-            returns = (returns - returns.mean()) / (returns.std() + 1e-8)
-        policy_loss = []
-        for log_prob, R in zip(self.log_probs, returns):
-            policy_loss.append(-log_prob * R)
+            action, _ = self.select_action(state, training=False)
+        original_action = action
+        if not self.is_valid_phase_transition(action):
+            action = self.next_valid_phase()
+        if self.telemetry is not None or self.experience_store is not None:
+            reward = self.compute_reward(vehicle_manager, original_action)
+        if self.telemetry is not None:
+            self.telemetry.append({
+                "phase": self.current_phase,
+                "action": action,
+                "original_action": original_action,
+                "reward": reward
+            })
+        if self.experience_store is not None:
+            self.experience_store.append(state.numpy(), original_action, reward, False, self.current_phase, "live")
+        self.last_phase = self.current_phase
+        self.current_phase = action
+        self.phase_timer = 0
+
+    def store_transition(self, state, log_prob, reward, done=False):
+        if isinstance(state, np.ndarray):
+            state = torch.from_numpy(state).float()
+        self.state_history.append(state)
+        self.log_probs.append(log_prob)
+        self.rewards_history.append(reward)
+        self.dones_history.append(float(done))
+
+    def update_policy(self, next_state=None):
+        # next_state is the observation after the last stored step when the window was cut short
+        rewards = torch.tensor(self.rewards_history, dtype=torch.float32)
+        dones = torch.tensor(self.dones_history, dtype=torch.float32)
+        log_probs = torch.stack(self.log_probs)
+        if self.value_net is not None:
+            values = self.value_net(torch.stack(self.state_history))
+            last_value = None
+            if next_state is not None and not self.dones_history[-1]:
+                with torch.no_grad():
+                    last_value = self.value_net(next_state)
+            advantages, returns = compute_gae(rewards, values.detach(), dones, self.gamma, self.gae_lambda, last_value)
+            value_loss = F.mse_loss(values, returns)
+            self.value_optimizer.zero_grad()
+            value_loss.backward()
+            self.value_optimizer.step()
+        else:
+            advantages = discounted_returns(rewards, dones, self.gamma)
+        if len(advantages) > 1:
+            advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-8)
         self.optimizer.zero_grad()
-        policy_loss = torch.stack(policy_loss).sum()
+        policy_loss = -(log_probs * advantages).sum()
         policy_loss.backward()
         self.optimizer.step()
         self.rewards_history = []
         self.log_probs = []
         self.state_history = []
+        self.dones_history = []
         if not self.reward_based_decay:
             self.epsilon = max(self.epsilon * self.epsilon_decay, self.epsilon_min)
 
@@ -0,0 +1,36 @@
+import tracemalloc
+from models.reinforce_agent import TrafficControllerRL
+from env.traffic_simulation import VehicleManager
+
+TELEMETRY_SIZE = 100
+# One decision per shortest phase over 24 hours of operation
+SOAK_DECISIONS = 24 * 3600 // 2
+
+def run_decisions(controller, vehicle_manager, count):
+    for _ in range(count):
+        # dt covers the longest phase, so every update makes a decision
+        controller.update(10.0, vehicle_manager, training=False)
+        vehicle_manager.update(vehicle_manager.spawn_interval, controller.current_phase)
+
+def test_inference_stores_no_trajectory():
+    controller = TrafficControllerRL(epsilon_start=0.0, telemetry_size=TELEMETRY_SIZE)
+    vehicle_manager = VehicleManager()
+    run_decisions(controller, vehicle_manager, 1000)
+    assert controller.log_probs == []
+    assert controller.state_history == []
+    assert controller.rewards_history == []
+    assert len(controller.telemetry) == TELEMETRY_SIZE
+
+def test_inference_memory_stays_flat_over_soak_run():
+    controller = TrafficControllerRL(epsilon_start=0.0, telemetry_size=TELEMETRY_SIZE)
+    vehicle_manager = VehicleManager()
+    # Warm up so the telemetry ring buffer and traffic reach steady state
+    run_decisions(controller, vehicle_manager, 2000)
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    run_decisions(controller, vehicle_manager, SOAK_DECISIONS)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(controller.telemetry) <= TELEMETRY_SIZE
+    assert controller.log_probs == []
+    assert current - baseline < 1024 * 1024
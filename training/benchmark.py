@@ -0,0 +1,117 @@
+import random
+import time
+import numpy as np
+import torch
+import matplotlib.pyplot as plt
+from models.reinforce_agent import TrafficControllerRL
+from env.traffic_env import TrafficEnv
+from training.train import load_config, run_episode
+
+def legacy_update_policy(controller):
+    # update_policy as it was before the batched kernel: list-insert returns, per-step loss terms
+    R = 0
+    returns = []
+    for r in controller.rewards_history[::-1]:
+        R = r + controller.gamma * R
+        returns.insert(0, R)
+    returns = torch.tensor(returns)
+    if len(returns) > 1:
+        returns = (returns - returns.mean()) / (returns.std() + 1e-8)
+    policy_loss = []
+    for log_prob, R in zip(controller.log_probs, returns):
+        policy_loss.append(-log_prob * R)
+    controller.optimizer.zero_grad()
+    policy_loss = torch.stack(policy_loss).sum()
+    policy_loss.backward()
+    controller.optimizer.step()
+    controller.rewards_history = []
+    controller.log_probs = []
+    controller.state_history = []
+    controller.dones_history = []
+
+def fill_rollout(controller, length, episode_length=200):
+    # Per-step forward passes, as run_episode builds them; excluded from the timing
+    for t in range(length):
+        state = torch.rand(7)
+        _, log_prob = controller.select_action(state, training=False)
+        controller.store_transition(state, log_prob, random.uniform(-10, 10), (t + 1) % episode_length == 0)
+
+def benchmark_update_time(lengths=(200, 1000, 5000, 20000), repeats=3):
+    variants = [
+        ("legacy", False, legacy_update_policy),
+        ("batched", False, TrafficControllerRL.update_policy),
+        ("batched + value baseline", True, TrafficControllerRL.update_policy)
+    ]
+    results = {label: [] for label, _, _ in variants}
+    for length in lengths:
+        for label, use_baseline, update in variants:
+            controller = TrafficControllerRL(use_baseline=use_baseline)
+            elapsed = 0.0
+            for _ in range(repeats):
+                fill_rollout(controller, length)
+                start = time.perf_counter()
+                update(controller)
+                elapsed += time.perf_counter() - start
+            results[label].append(elapsed / repeats)
+            print(f"Rollout length {length}, {label}: {elapsed / repeats * 1000:.2f} ms per update")
+    return list(lengths), results
+
+def seed_everything(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+def learning_curve(num_episodes, use_baseline, seed=0):
+    # TrafficEnv draws from np.random and epsilon-greedy from random, so all three are seeded
+    seed_everything(seed)
+    config = load_config()
+    env = TrafficEnv(config)
+    controller = TrafficControllerRL(
+        epsilon_start=config['exploration']['epsilon_start'],
+        epsilon_min=config['exploration']['epsilon_min'],
+        epsilon_decay=config['exploration']['epsilon_decay'],
+        use_baseline=use_baseline
+    )
+    rewards = []
+    for _ in range(num_episodes):
+        total_reward, _, _, _ = run_episode(env, controller)
+        controller.decay_epsilon_after_episode(total_reward)
+        rewards.append(total_reward)
+    return rewards
+
+def compare_learning_curves(num_episodes=200, seeds=(0, 1, 2), save_path='learning_curves.png'):
+    max_timesteps = load_config()['environment']['max_timesteps']
+    curves = {}
+    for label, use_baseline in [("REINFORCE", False), ("REINFORCE + value baseline (GAE)", True)]:
+        runs = [learning_curve(num_episodes, use_baseline, seed) for seed in seeds]
+        curves[label] = [sum(r[i] for r in runs) / len(runs) for i in range(num_episodes)]
+
+    plt.figure(figsize=(12, 4))
+    plt.subplot(1, 2, 1)
+    for label, rewards in curves.items():
+        steps = [(i + 1) * max_timesteps for i in range(num_episodes)]
+        plt.plot(steps, rewards, label=label)
+    plt.title("Episode Reward vs Environment Steps")
+    plt.xlabel("Environment Steps")
+    plt.ylabel("Reward")
+    plt.legend()
+    plt.grid(True)
+
+    lengths, timings = benchmark_update_time()
+    plt.subplot(1, 2, 2)
+    for label, seconds in timings.items():
+        plt.plot(lengths, seconds, marker='o', label=label)
+    plt.title("update_policy Time vs Rollout Length")
+    plt.xlabel("Rollout Length")
+    plt.ylabel("Seconds")
+    plt.xscale('log')
+    plt.yscale('log')
+    plt.legend()
+    plt.grid(True)
+
+    plt.tight_layout()
+    plt.savefig(save_path)
+    return curves, timings
+
+if __name__ == "__main__":
+    compare_learning_curves()
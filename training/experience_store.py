@@ -0,0 +1,284 @@
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+
+# Which writer produced a row. The two sources use different observation and action spaces:
+#   env  - TrafficEnv rollouts from train(). obs is [4 lane counts (0-100), horizontal flag,
+#          phase timer in steps, timer / phase duration]; action is the raw policy output (0-3),
+#          stored unmapped; TrafficEnv holds on 0, advances on 1 and scores 2 and 3 as neither.
+#   live - TrafficControllerRL.infer in the main.py loop. obs is [4 lane counts / 100,
+#          phase id, phase timer in seconds, correct-timing streak]; action is a target phase id.
+SOURCES = {"env": 0, "live": 1}
+
+# Fixed-width columns stored per segment; obs is (segment_size, obs_dim)
+FIELDS = {
+    "obs": np.float32,
+    "action": np.int8,
+    "reward": np.float32,
+    "done": np.bool_,
+    "phase": np.int8,
+    "source": np.int8,
+    "priority": np.float32
+}
+
+class ExperienceStore:
+    # Append-only transition store split into fixed-size memory-mapped segments.
+    # Row t+1 of the store is the observation that followed row t, unless row t is done
+    # (gather then returns the row's own obs as next_obs); the last row of a full segment
+    # continues into row 0 of the next one.
+    # One writer owns meta.json; a readonly store cannot append but may update priorities,
+    # so a learner can run prioritized replay beside a live writer.
+    def __init__(self, path, obs_dim=7, segment_size=1_000_000, readonly=False, flush_interval=10_000,
+                 max_open_segments=16):
+        self.path = path
+        self.readonly = readonly
+        self.flush_interval = flush_interval
+        self.max_open_segments = max_open_segments
+        self.meta_path = os.path.join(path, "meta.json")
+        self.priority_path = os.path.join(path, "priorities.json")
+        # Every mapped column holds a file descriptor, so only recently used segments stay open
+        self.segments = OrderedDict()
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r') as file:
+                self.meta = json.load(file)
+        elif readonly:
+            raise FileNotFoundError(f"No experience store at {path}")
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.meta = {"obs_dim": obs_dim, "segment_size": segment_size, "segments": []}
+        self.obs_dim = self.meta["obs_dim"]
+        self.segment_size = self.meta["segment_size"]
+        self.load_priority_deltas()
+        self.unflushed = 0
+        if not readonly:
+            self.start_session()
+
+    def __len__(self):
+        return sum(seg["count"] for seg in self.meta["segments"])
+
+    def start_session(self):
+        # Resume the last segment if it has room; the previous session's final row is marked
+        # done so rows from separate runs never chain into one trajectory
+        if self.meta["segments"]:
+            last = len(self.meta["segments"]) - 1
+            seg = self.meta["segments"][last]
+            if seg["count"] and not seg["last_done"]:
+                self.open_segment(last)["done"][seg["count"] - 1] = True
+                seg["last_done"] = True
+            if seg["count"] < self.segment_size:
+                self.write_meta()
+                return
+        self.rotate()
+
+    def segment_dir(self, index):
+        return os.path.join(self.path, self.meta["segments"][index]["name"])
+
+    def open_segment(self, index, create=False):
+        if index in self.segments:
+            self.segments.move_to_end(index)
+            return self.segments[index]
+        seg_dir = self.segment_dir(index)
+        arrays = {}
+        for field, dtype in FIELDS.items():
+            file_path = os.path.join(seg_dir, f"{field}.npy")
+            if create:
+                shape = (self.segment_size, self.obs_dim) if field == "obs" else (self.segment_size,)
+                arrays[field] = np.lib.format.open_memmap(file_path, mode='w+', dtype=dtype, shape=shape)
+            else:
+                writable = not self.readonly or field == "priority"
+                arrays[field] = np.load(file_path, mmap_mode='r+' if writable else 'r')
+        self.segments[index] = arrays
+        active = None if self.readonly else len(self.meta["segments"]) - 1
+        while len(self.segments) > self.max_open_segments:
+            oldest = next(i for i in self.segments if i != active)
+            self.close_segment(oldest)
+        return arrays
+
+    def close_segment(self, index):
+        arrays = self.segments.pop(index)
+        if not self.readonly:
+            for array in arrays.values():
+                array.flush()
+        else:
+            arrays["priority"].flush()
+
+    def rotate(self):
+        if self.meta["segments"]:
+            self.flush()
+            last = len(self.meta["segments"]) - 1
+            if last in self.segments:
+                self.close_segment(last)
+        index = len(self.meta["segments"])
+        name = f"segment_{index:05d}"
+        os.makedirs(os.path.join(self.path, name), exist_ok=True)
+        self.meta["segments"].append({"name": name, "count": 0, "last_done": False, "priority_sum": 0.0})
+        self.open_segment(index, create=True)
+        self.write_meta()
+
+    def append(self, obs, action, reward, done, phase, source, priority=1.0):
+        if self.readonly:
+            raise RuntimeError("Experience store was opened read-only")
+        index = len(self.meta["segments"]) - 1
+        seg = self.meta["segments"][index]
+        if seg["count"] >= self.segment_size:
+            self.rotate()
+            index += 1
+            seg = self.meta["segments"][index]
+        arrays = self.open_segment(index)
+        row = seg["count"]
+        arrays["obs"][row] = obs
+        arrays["action"][row] = action
+        arrays["reward"][row] = reward
+        arrays["done"][row] = done
+        arrays["phase"][row] = phase
+        arrays["source"][row] = SOURCES[source]
+        arrays["priority"][row] = priority
+        seg["count"] += 1
+        seg["last_done"] = bool(done)
+        seg["priority_sum"] += priority
+        self.unflushed += 1
+        if self.unflushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.readonly or not self.meta["segments"]:
+            return
+        index = len(self.meta["segments"]) - 1
+        if index in self.segments:
+            for array in self.segments[index].values():
+                array.flush()
+        self.write_meta()
+        self.unflushed = 0
+
+    def write_meta(self):
+        write_json(self.meta_path, self.meta)
+
+    def load_priority_deltas(self):
+        # Priority mass changed by update_priorities, per segment name, on top of meta's priority_sum
+        self.priority_deltas = {}
+        if os.path.exists(self.priority_path):
+            with open(self.priority_path, 'r') as file:
+                self.priority_deltas = json.load(file)
+
+    def refresh(self):
+        # Pick up rows another process has flushed since this store was opened
+        with open(self.meta_path, 'r') as file:
+            self.meta = json.load(file)
+        self.load_priority_deltas()
+
+    def close(self):
+        self.flush()
+        for index in list(self.segments):
+            self.close_segment(index)
+
+    def segment_mass(self, index):
+        seg = self.meta["segments"][index]
+        return seg["priority_sum"] + self.priority_deltas.get(seg["name"], 0.0)
+
+    def sampleable_counts(self):
+        # A segment's last row needs a successor: it is done, or the next segment has started.
+        # Read from meta only, so sampling never maps segments it does not draw from.
+        segments = self.meta["segments"]
+        counts = []
+        for index, seg in enumerate(segments):
+            count = seg["count"]
+            continues = index + 1 < len(segments) and segments[index + 1]["count"] > 0
+            if count and not seg["last_done"] and not continues:
+                count -= 1
+            counts.append(count)
+        return np.array(counts, dtype=np.int64)
+
+    def gather(self, seg_ids, rows):
+        batch = {
+            "obs": np.empty((len(rows), self.obs_dim), dtype=np.float32),
+            "next_obs": np.empty((len(rows), self.obs_dim), dtype=np.float32)
+        }
+        for field in ("action", "reward", "done", "phase", "source"):
+            batch[field] = np.empty(len(rows), dtype=FIELDS[field])
+        for index in np.unique(seg_ids):
+            mask = seg_ids == index
+            seg_rows = rows[mask]
+            order = np.argsort(seg_rows)  # ascending reads keep page faults sequential
+            sorted_rows = seg_rows[order]
+            positions = np.flatnonzero(mask)[order]
+            arrays = self.open_segment(index)
+            for field in ("obs", "action", "reward", "done", "phase", "source"):
+                batch[field][positions] = arrays[field][sorted_rows]
+            count = self.meta["segments"][index]["count"]
+            inside = sorted_rows + 1 < count
+            batch["next_obs"][positions[inside]] = arrays["obs"][sorted_rows[inside] + 1]
+            boundary = positions[~inside & ~batch["done"][positions]]
+            if len(boundary):
+                batch["next_obs"][boundary] = self.open_segment(index + 1)["obs"][0]
+        # A done row has no successor; its next_obs is its own obs wherever it sits in the store
+        done = batch["done"]
+        batch["next_obs"][done] = batch["obs"][done]
+        batch["seg_ids"] = seg_ids
+        batch["rows"] = rows
+        return batch
+
+    def sample(self, batch_size, rng=np.random):
+        counts = self.sampleable_counts()
+        total = counts.sum()
+        if total == 0:
+            raise ValueError("Experience store is empty")
+        flat = rng.randint(0, total, size=batch_size)
+        bounds = np.cumsum(counts)
+        seg_ids = np.searchsorted(bounds, flat, side='right')
+        rows = flat - (bounds[seg_ids] - counts[seg_ids])
+        return self.gather(seg_ids, rows)
+
+    def sample_prioritized(self, batch_size, beta=0.4, rng=np.random):
+        # Two-level proportional sampling: pick segments by the priority mass kept in meta,
+        # then rows within each picked segment, so untouched segments are never read
+        counts = self.sampleable_counts()
+        seg_mass = np.zeros(len(counts))
+        for index, count in enumerate(counts):
+            if not count:
+                continue
+            seg_mass[index] = self.segment_mass(index)
+            if count < self.meta["segments"][index]["count"]:
+                # The held-back last row cannot be drawn, so its priority is not part of the mass
+                seg_mass[index] -= float(self.open_segment(index)["priority"][count])
+        total_mass = seg_mass.sum()
+        if total_mass <= 0:
+            raise ValueError("Experience store is empty")
+        seg_ids = rng.choice(len(counts), size=batch_size, p=seg_mass / total_mass)
+        rows = np.empty(batch_size, dtype=np.int64)
+        probs = np.empty(batch_size, dtype=np.float64)
+        for index in np.unique(seg_ids):
+            positions = np.flatnonzero(seg_ids == index)
+            priorities = self.open_segment(index)["priority"][:counts[index]].astype(np.float64)
+            cumulative = np.cumsum(priorities)
+            picks = np.searchsorted(cumulative, rng.uniform(0, cumulative[-1], size=len(positions)), side='right')
+            picks = np.minimum(picks, counts[index] - 1)
+            rows[positions] = picks
+            # P(row) = P(segment) * P(row | segment); meta mass and the row sum can differ slightly
+            probs[positions] = (seg_mass[index] / total_mass) * priorities[picks] / cumulative[-1]
+        batch = self.gather(seg_ids, rows)
+        weights = (counts.sum() * probs) ** -beta
+        batch["weights"] = (weights / weights.max()).astype(np.float32)
+        return batch
+
+    def update_priorities(self, seg_ids, rows, errors, alpha=0.6, eps=1e-6):
+        # Stored priorities are already raised to alpha, so sampling is a plain proportional draw.
+        # Mass changes go to priorities.json rather than meta.json, which belongs to the writer.
+        for index, row, error in zip(seg_ids, rows, errors):
+            index = int(index)
+            arrays = self.open_segment(index)
+            priority = (abs(float(error)) + eps) ** alpha
+            name = self.meta["segments"][index]["name"]
+            self.priority_deltas[name] = self.priority_deltas.get(name, 0.0) + priority - float(arrays["priority"][row])
+            arrays["priority"][row] = priority
+        for index in np.unique(seg_ids):
+            if int(index) in self.segments:
+                self.segments[int(index)]["priority"].flush()
+        write_json(self.priority_path, self.priority_deltas)
+
+def write_json(path, data):
+    # Write-then-rename so readers in other processes never see a partial file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
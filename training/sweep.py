@@ -0,0 +1,153 @@
+import copy
+import csv
+import itertools
+import multiprocessing as mp
+import os
+import random
+import shutil
+import numpy as np
+import torch
+import yaml
+from training.train import load_config, train
+
+def set_by_path(config, dotted_key, value):
+    keys = dotted_key.split('.')
+    node = config
+    for key in keys[:-1]:
+        node = node[key]
+    node[keys[-1]] = value
+
+def sample_value(spec):
+    # Lists are categorical choices, {low, high} dicts are sampled uniformly
+    if isinstance(spec, dict):
+        value = random.uniform(spec['low'], spec['high'])
+        return round(value) if spec.get('integer', False) else value
+    return random.choice(spec)
+
+def generate_trials(search_space, mode='grid', num_trials=None):
+    keys = list(search_space)
+    if mode == 'grid':
+        if any(isinstance(spec, dict) for spec in search_space.values()):
+            raise ValueError("Grid sweeps need a list of values for every parameter")
+        trials = [dict(zip(keys, values)) for values in itertools.product(*(search_space[k] for k in keys))]
+        if num_trials and num_trials < len(trials):
+            # Sample across the whole grid (seeded by run_sweep) rather than its first rows
+            print(f"Grid has {len(trials)} points; running a random {num_trials} of them")
+            trials = [trials[i] for i in sorted(random.sample(range(len(trials)), num_trials))]
+        return trials
+    elif mode == 'random':
+        return [{k: sample_value(search_space[k]) for k in keys} for _ in range(num_trials)]
+    raise ValueError(f"Unknown sweep mode: {mode}")
+
+def rung_budgets(min_episodes, max_episodes, eta):
+    budgets = []
+    budget = min_episodes
+    while budget < max_episodes:
+        budgets.append(budget)
+        budget *= eta
+    return budgets
+
+class SuccessiveHalving:
+    # Asynchronous successive halving: a trial reaching a rung keeps going only if its
+    # score is in the top 1/eta of the scores already recorded at that rung
+    def __init__(self, rung_scores, lock, budgets, eta, window):
+        self.rung_scores = rung_scores
+        self.lock = lock
+        self.budgets = budgets
+        self.eta = eta
+        self.window = window
+        self.rewards = []
+
+    def __call__(self, episode, total_reward):
+        self.rewards.append(float(total_reward))
+        if episode + 1 not in self.budgets:
+            return False
+        score = float(np.mean(self.rewards[-self.window:]))
+        with self.lock:
+            scores = self.rung_scores.get(episode + 1, []) + [score]
+            self.rung_scores[episode + 1] = scores
+        if len(scores) < self.eta:
+            return False
+        keep = max(1, len(scores) // self.eta)
+        return score < sorted(scores, reverse=True)[keep - 1]
+
+def run_trial(args):
+    trial_id, params, base_config, sweep_config, output_dir, rung_scores, lock = args
+    seed = sweep_config['seed'] + trial_id
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    torch.set_num_threads(1)
+
+    config = copy.deepcopy(base_config)
+    for key, value in params.items():
+        set_by_path(config, key, value)
+    trial_dir = os.path.join(output_dir, f"trial_{trial_id:03d}")
+    os.makedirs(trial_dir, exist_ok=True)
+    # Stores are single-writer, so each trial records into its own directory
+    config['experience']['training_path'] = os.path.join(trial_dir, "experience")
+    config_path = os.path.join(trial_dir, "config.yaml")
+    with open(config_path, 'w') as file:
+        yaml.safe_dump(config, file)
+
+    budgets = rung_budgets(sweep_config['min_episodes'], sweep_config['max_episodes'], sweep_config['eta'])
+    scheduler = SuccessiveHalving(rung_scores, lock, budgets, sweep_config['eta'], sweep_config['score_window'])
+    try:
+        rewards = train(
+            sweep_config['max_episodes'],
+            save_path=os.path.join(trial_dir, "policy.pth"),
+            config_path=config_path,
+            episode_callback=scheduler,
+            verbose=False
+        )
+    except Exception as error:
+        print(f"Trial {trial_id}: failed with {error!r}")
+        return {"trial": trial_id, **params, "episodes": len(scheduler.rewards), "score": float('nan'),
+                "stopped_early": True, "error": repr(error)}
+    score = float(np.mean(rewards[-sweep_config['score_window']:]))
+    stopped = len(rewards) < sweep_config['max_episodes']
+    print(f"Trial {trial_id}: score {score:.2f} after {len(rewards)} episodes{' (stopped early)' if stopped else ''}")
+    return {"trial": trial_id, **params, "episodes": len(rewards), "score": score, "stopped_early": stopped, "error": ""}
+
+def run_sweep(config_path='configs/config.yaml', output_dir='sweeps/latest'):
+    base_config = load_config(config_path)
+    sweep_config = base_config['sweep']
+    random.seed(sweep_config['seed'])
+    trials = generate_trials(sweep_config['search_space'], sweep_config['mode'], sweep_config.get('num_trials'))
+    os.makedirs(output_dir, exist_ok=True)
+    workers = sweep_config.get('workers') or os.cpu_count()
+
+    fieldnames = ["trial", *sweep_config['search_space'], "episodes", "score", "stopped_early", "error"]
+    results = []
+    with mp.Manager() as manager:
+        rung_scores = manager.dict()
+        lock = manager.Lock()
+        jobs = [
+            (trial_id, params, base_config, sweep_config, output_dir, rung_scores, lock)
+            for trial_id, params in enumerate(trials)
+        ]
+        # Rows are written as trials finish so a crash part way through keeps what has completed
+        with open(os.path.join(output_dir, "results.csv"), 'w', newline='') as file, mp.Pool(workers) as pool:
+            writer = csv.DictWriter(file, fieldnames=fieldnames)
+            writer.writeheader()
+            for result in pool.imap_unordered(run_trial, jobs):
+                writer.writerow(result)
+                file.flush()
+                results.append(result)
+
+    # Early-stopped trials were scored on a smaller budget, so only full-length trials compete
+    finished = [r for r in results if r['episodes'] == sweep_config['max_episodes'] and not r['error']]
+    if not finished:
+        print(f"No trial reached {sweep_config['max_episodes']} episodes; results in {output_dir}")
+        return results
+    best = max(finished, key=lambda r: r['score'])
+
+    # Keep the best trial's config and policy at the top of the sweep directory
+    best_dir = os.path.join(output_dir, f"trial_{best['trial']:03d}")
+    shutil.copy(os.path.join(best_dir, "config.yaml"), os.path.join(output_dir, "best_config.yaml"))
+    shutil.copy(os.path.join(best_dir, "policy.pth"), os.path.join(output_dir, "best_policy.pth"))
+    print(f"Best trial {best['trial']} with score {best['score']:.2f}; results in {output_dir}")
+    return results
+
+if __name__ == "__main__":
+    run_sweep()
@@ -1,22 +1,53 @@
 import yaml
 from models.reinforce_agent import TrafficControllerRL
-from env.traffic_env import TrafficEnv
+from env.traffic_env import TrafficEnv, PHASE_IDS
 from env.traffic_simulation import Vehicle, VehicleManager
 from visualization.console_output import print_episode_summary, print_training_summary
 from visualization.performance_visualization import plot_metrics
+from training.experience_store import ExperienceStore
 import os
+import torch
 
 def load_config(config_path='configs/config.yaml'):
     with open(config_path, 'r') as file:
         return yaml.safe_load(file)
 
-def train(num_episodes=100, save_path="models/policy.pth"):
-    config = load_config()
+def run_episode(env, controller, store=None):
+    state = env.reset()
+    done = False
+    total_reward = 0
+    timing_violations = 0
+    correct_timings = 0
+    reasons = []
+
+    while not done:
+        obs = torch.from_numpy(state).float()
+        action, log_prob = controller.select_action(obs, training=True)
+        phase = PHASE_IDS[env.current_phase]
+        state, reward, done, info = env.step(action)
+        if store is not None:
+            store.append(obs.numpy(), action, reward, done, phase, "env")
+        controller.store_transition(obs, log_prob, reward, done)
+        total_reward += reward
+        timing_violations += info.get('timing_violation', 0)
+        correct_timings += info.get('correct_timing', 0)
+        if 'reasons' in info and info['reasons']:
+            reasons = info['reasons']
+    controller.update_policy()
+    return total_reward, timing_violations, correct_timings, reasons
+
+def train(num_episodes=100, save_path="models/policy.pth", use_baseline=None,
+          config_path='configs/config.yaml', episode_callback=None, verbose=True):
+    # episode_callback(episode, total_reward) may return True to stop training early
+    config = load_config(config_path)
     env = TrafficEnv(config)
     epsilon_start = config['exploration']['epsilon_start']
     epsilon_min = config['exploration']['epsilon_min']
     epsilon_decay = config['exploration']['epsilon_decay']
-    controller = TrafficControllerRL(epsilon_start=epsilon_start, epsilon_min=epsilon_min, epsilon_decay=epsilon_decay)
+    controller = TrafficControllerRL(epsilon_start=epsilon_start, epsilon_min=epsilon_min, epsilon_decay=epsilon_decay, use_baseline=use_baseline, config_path=config_path)
+    store = None
+    if config['experience']['record_training']:
+        store = ExperienceStore(config['experience']['training_path'], segment_size=config['experience']['segment_size'])
     rewards = []
     epsilons = []
     timing_violations_list = []
@@ -24,21 +55,7 @@ def train(num_episodes=100, save_path="models/policy.pth"):
     prev_total_reward = None
 
     for episode in range(num_episodes):
-        state = env.reset()
-        done = False
-        total_reward = 0
-        timing_violations = 0
-        correct_timings = 0
-        reasons = []
-
-        while not done:
-            action, _ = controller.select_action(state, training=True)
-            state, reward, done, info = env.step(action)
-            total_reward += reward
-            timing_violations += info.get('timing_violation', 0)
-            correct_timings += info.get('correct_timing', 0)
-            if 'reasons' in info and info['reasons']:
-                reasons = info['reasons']
+        total_reward, timing_violations, correct_timings, reasons = run_episode(env, controller, store)
         controller.decay_epsilon_after_episode(total_reward)
         rewards.append(total_reward)
         epsilons.append(controller.epsilon)
@@ -57,18 +74,26 @@ def train(num_episodes=100, save_path="models/policy.pth"):
         total_timings = timing_violations + correct_timings
         timing_accuracy = 100.0 * correct_timings / total_timings if total_timings else 0.0
 
-        print_episode_summary(
-            episode, total_reward, performance,
-            timing_violations, correct_timings, timing_accuracy,
-            controller.epsilon, reasons
-        )
+        if verbose:
+            print_episode_summary(
+                episode, total_reward, performance,
+                timing_violations, correct_timings, timing_accuracy,
+                controller.epsilon, reasons
+            )
+
+        if episode_callback is not None and episode_callback(episode, total_reward):
+            break
 
-    print_training_summary(
-        num_episodes, sum(rewards), sum(timing_violations_list), sum(correct_timings_list)
-    )
+    if store is not None:
+        store.close()
 
-    plot_metrics(rewards, epsilons)
+    if verbose:
+        print_training_summary(
+            len(rewards), sum(rewards), sum(timing_violations_list), sum(correct_timings_list)
+        )
+        plot_metrics(rewards, epsilons)
 
     # Save the trained policy
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    controller.save(save_path)
\ No newline at end of file
+    controller.save(save_path)
+    return rewards
\ No newline at end of file
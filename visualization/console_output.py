@@ -25,4 +25,15 @@ def print_training_summary(
     print(f"Total Cumulative Reward: {total_reward:.2f}")
     print(f"Total Timing Violations: {total_violations}")
     print(f"Total Correct Timings: {total_correct}")
-    print("===============================")
\ No newline at end of file
+    print("===============================")
+
+def print_simulation_summary(metrics, lane_stats):
+    print("\n======= Simulation Summary =======")
+    print(f"Simulated Time: {metrics['elapsed_time']:.1f}s")
+    print(f"Throughput: {metrics['throughput']} vehicles ({metrics['throughput_per_minute']:.1f}/min)")
+    print(f"Average Delay: {metrics['average_delay']:.2f}s per vehicle")
+    print(f"Peak Queue Length: {metrics['peak_queue_length']:.1f}m")
+    for direction, stats in lane_stats.items():
+        print(f"{direction.capitalize()}: arrivals {stats['arrivals']}, departures {stats['departures']}, "
+              f"wait {stats['wait_time']:.1f}s, queue {stats['queue_length']:.1f}m")
+    print("==================================")
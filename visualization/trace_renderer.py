@@ -0,0 +1,83 @@
+import multiprocessing as mp
+import os
+import shutil
+import subprocess
+import sys
+
+# Rendering never opens a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from env.trace import TIME_TOLERANCE, TraceReader
+from env.traffic_simulation import (
+    WIDTH, HEIGHT, Phase, Vehicle, draw_intersection, draw_stop_lines, draw_traffic_lights, draw_info
+)
+
+def draw_frame(screen, phase, vehicles):
+    draw_intersection(screen)
+    draw_stop_lines(screen)
+    draw_traffic_lights(screen, phase, Phase)
+    for _, direction, x, y in vehicles:
+        vehicle = Vehicle(direction)
+        vehicle.x, vehicle.y = x, y
+        vehicle.draw(screen)
+    draw_info(screen, phase, len(vehicles))
+
+def render_blocks(args):
+    trace_path, output_dir, block_indices, start_time, end_time, stride = args
+    pygame.init()
+    screen = pygame.Surface((WIDTH, HEIGHT))
+    reader = TraceReader(trace_path)
+    rendered = 0
+    for block_index in block_indices:
+        for frame_number, timestamp, phase, _, vehicles in reader.decode_block(block_index):
+            if timestamp < start_time - TIME_TOLERANCE or (end_time is not None and timestamp > end_time + TIME_TOLERANCE):
+                continue
+            if frame_number % stride:
+                continue
+            draw_frame(screen, phase, vehicles)
+            pygame.image.save(screen, os.path.join(output_dir, f"frame_{frame_number // stride:07d}.png"))
+            rendered += 1
+    pygame.quit()
+    return rendered
+
+def render_trace(trace_path, output_dir, start_time=0.0, end_time=None, stride=1, workers=None):
+    # Each worker decodes and draws whole blocks, so chunks start at their own keyframe
+    reader = TraceReader(trace_path)
+    os.makedirs(output_dir, exist_ok=True)
+    first = reader.block_for_time(start_time)
+    last = len(reader.blocks) - 1 if end_time is None else reader.block_for_time(end_time)
+    block_indices = list(range(first, last + 1))
+    workers = min(workers or os.cpu_count(), len(block_indices)) or 1
+    chunks = [block_indices[i::workers] for i in range(workers)]
+    jobs = [(trace_path, output_dir, chunk, start_time, end_time, stride) for chunk in chunks]
+    with mp.Pool(workers) as pool:
+        rendered = sum(pool.map(render_blocks, jobs))
+    return rendered
+
+def render_video(trace_path, video_path, fps=60, start_time=0.0, end_time=None, stride=1, workers=None):
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg is required to encode video; use render_trace for image frames")
+    frames_dir = video_path + ".frames"
+    render_trace(trace_path, frames_dir, start_time, end_time, stride, workers)
+    frames = sorted(f for f in os.listdir(frames_dir) if f.endswith(".png"))
+    with open(os.path.join(frames_dir, "frames.txt"), 'w') as file:
+        for frame in frames:
+            file.write(f"file '{frame}'\nduration {stride / fps}\n")
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+         "-i", os.path.join(frames_dir, "frames.txt"), "-pix_fmt", "yuv420p", os.path.abspath(video_path)],
+        check=True
+    )
+    shutil.rmtree(frames_dir)
+    return video_path
+
+if __name__ == "__main__":
+    # python -m visualization.trace_renderer <trace_dir> <output.mp4 | frames_dir> [start_time] [end_time]
+    trace_path, output = sys.argv[1], sys.argv[2]
+    start = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    end = float(sys.argv[4]) if len(sys.argv) > 4 else None
+    if output.endswith((".mp4", ".avi", ".mkv", ".gif")):
+        render_video(trace_path, output, start_time=start, end_time=end)
+    else:
+        render_trace(trace_path, output, start_time=start, end_time=end)